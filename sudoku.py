@@ -1,61 +1,119 @@
 """Efficient Sudoku solver"""
 
 from __future__ import annotations
-from collections.abc import Iterator
+from collections.abc import Iterable, Iterator
+from multiprocessing import Pool
+from sys import argv
 from time import perf_counter
 
 
-def key(row: int, col: int) -> str:
-    """Encodes a coordinate such as (3,1) with the string 31"""
-    return str(row) + str(col)
+ALL_DIGITS = 0b111111111
+"""Bitmask with the bits of all nine digits set"""
 
+BIT = [0] + [1 << (digit - 1) for digit in range(1, 10)]
+"""Bitmask for each digit: bit d-1 encodes the digit d"""
 
-coords = {key(row, col) for row in range(9) for col in range(9)}
-"""Set of all coordinates"""
+NBIT = [~bit & ALL_DIGITS for bit in BIT]
+"""Complement of BIT within the 9 candidate bits, so removing a digit
+from a mask is a single AND without negating at every call site"""
 
-row_units = [{key(row, col) for col in range(9)} for row in range(9)]
-"""Lists of all rows as sets of coordinates"""
+POPCOUNT = bytes(mask.bit_count() for mask in range(512))
+"""Lookup table for the number of candidates encoded in a 9-bit mask"""
 
-col_units = [{key(row, col) for row in range(9)} for col in range(9)]
-"""List of all columns as sets of coordinates"""
+PARSE_TABLE = bytes.maketrans(b".", b"0")
+"""Translation table mapping the empty-square marker to the digit 0"""
+
+LINE_TABLE = bytes.maketrans(bytes(range(10)), b"0123456789")
+"""Translation table mapping digit values to their characters"""
+
+DISPLAY_TABLE = bytes.maketrans(bytes(range(10)), b".123456789")
+"""Translation table mapping digit values to their characters, with a
+dot for an empty square"""
+
+
+Trail = list[tuple[int, int, int]]
+"""Trail of (coordinate, value, candidate mask) triples recorded before
+each mutation, so that the search can rewind instead of copying state"""
+
+
+def iter_digits(mask: int) -> Iterator[int]:
+    """Iterates over the digits encoded in a candidate bitmask"""
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        yield bit.bit_length()
+
+
+coords = range(81)
+"""Range of all coordinates"""
+
+row_units = [bytes(9 * row + col for col in range(9)) for row in range(9)]
+"""List of all rows as bytes of coordinates (the coordinate of the
+square in row r and column c is the index 9 * r + c)"""
+
+col_units = [bytes(9 * row + col for row in range(9)) for col in range(9)]
+"""List of all columns as bytes of coordinates"""
 
 box_units = [
-    {key(3 * box_row + i, 3 * box_col + j) for i in range(3) for j in range(3)}
+    bytes(
+        9 * (3 * box_row + i) + 3 * box_col + j for i in range(3) for j in range(3)
+    )
     for box_row in range(3)
     for box_col in range(3)
 ]
-"""List of all boxes as sets of coordinates"""
+"""List of all boxes as bytes of coordinates"""
 
 all_units = row_units + col_units + box_units
 """List of all units (rows, columns, boxes)"""
 
-peers: dict[str, set[str]] = {
-    coord: set.union(*(unit - {coord} for unit in all_units if coord in unit))
+BOX_OF = bytes(3 * (coord // 27) + (coord % 9) // 3 for coord in coords)
+"""Lookup table for the box index of a coordinate"""
+
+units_of: list[tuple[bytes, bytes, bytes]] = [
+    (row_units[coord // 9], col_units[coord % 9], box_units[BOX_OF[coord]])
     for coord in coords
-}
-"""Dictionary of all peers of a coordinate: the other coordinates that lie
-in the same unit, and hence need to have different values in a Sudoku"""
+]
+"""List of the three units (row, column, box) containing each coordinate,
+so that no `coord in unit` scan is ever needed after import"""
+
+unit_indices_of = [
+    bytes((coord // 9, 9 + coord % 9, 18 + BOX_OF[coord])) for coord in coords
+]
+"""List of the indices (into all_units) of the three units containing
+each coordinate"""
+
+peers: list[bytes] = [
+    bytes(sorted({peer for unit in units_of[coord] for peer in unit} - {coord}))
+    for coord in coords
+]
+"""List of all peers of a coordinate: the other coordinates that lie
+in the same unit, and hence need to have different values in a Sudoku.
+Units and peers are stored as bytes, since iterating over bytes yields
+small integers without any boxing overhead."""
 
 
 class Sudoku:
     """Sudoku class"""
 
+    __slots__ = ("values", "candidates", "has_contradiction", "dirty_units")
+
     def __init__(
         self,
-        values: dict[str, int],
-        candidates: dict[str, set[int]] | None = None,
+        values: list[int],
+        candidates: list[int] | None = None,
     ) -> None:
-        """Initialize a Sudoku with a value and candidate dictionaries
+        """Initialize a Sudoku with a value and candidate list
 
         Arguments:
-            values: dictionary associating to each coordinate the digit at this square
-            candidates: dictionary associating to each coordinate the set of its possible digits
+            values: list associating to each coordinate the digit at this square
+            candidates: list associating to each coordinate the bitmask of its possible digits
         """
         self.values = values
         self.has_contradiction = False
+        self.dirty_units = set(range(27))
 
         if candidates is None:
-            self.candidates = self.get_candidate_dict()
+            self.candidates = self.get_candidate_list()
         else:
             self.candidates = candidates
 
@@ -64,160 +122,387 @@ class Sudoku:
         board: list[list[int]],
     ) -> Sudoku:
         """Generates a Sudoku object from a given 2-dimensional list of integers"""
-        values = {
-            key(row, col): board[row][col] for row in range(9) for col in range(9)
-        }
+        values = [board[row][col] for row in range(9) for col in range(9)]
         return Sudoku(values)
 
     @staticmethod
     def generate_from_string(string: str) -> Sudoku:
         """Generates a Sudoku object from a one-line string as in the samples file"""
-        string = string.replace("\n", "")
-        assert len(string) == 81
-
-        def to_digit(c: str) -> int:
-            return int(c) if c.isnumeric() else 0
-
-        values = {
-            key(row, col): to_digit(string[row * 9 + col])
-            for row in range(9)
-            for col in range(9)
-        }
-        return Sudoku(values)
+        raw = string.replace("\n", "").encode("ascii").translate(PARSE_TABLE)
+        assert len(raw) == 81
+        return Sudoku([char - 48 for char in raw])
 
     def to_line(self) -> str:
         """Converts the Sudoku to a one-line string"""
-        return "".join(map(str, list(self.values.values())))
+        return bytes(self.values).translate(LINE_TABLE).decode("ascii")
 
     def __str__(self) -> str:
         """Computes a nice string representation of the Sudoku, used for printing to the console."""
-        output = " " + "-" * 23 + "\n"
+        display = bytes(self.values).translate(DISPLAY_TABLE).decode("ascii")
+        separator = " " + "-" * 23 + "\n"
+        parts = [separator]
         for row in range(9):
-            for col in range(9):
-                digit = self.values[key(row, col)]
-                if col == 0:
-                    output += "| "
-                output += (str(digit) if digit > 0 else ".") + " "
-                if col % 3 == 2:
-                    output += "| "
-            output += "\n"
+            chars = display[9 * row : 9 * row + 9]
+            parts.append("| {} {} {} | {} {} {} | {} {} {} | \n".format(*chars))
             if row % 3 == 2:
-                output += " " + "-" * 23 + "\n"
-        return output
+                parts.append(separator)
+        return "".join(parts)
 
     def copy(self) -> Sudoku:
         """Generates a copy of the Sudoku"""
-        candidates_copy = {coord: self.candidates[coord].copy() for coord in coords}
-        return Sudoku(self.values.copy(), candidates_copy)
+        return Sudoku(self.values.copy(), self.candidates.copy())
 
-    def get_candidates(self, coord: str) -> set[int]:
-        """Generates the set of candidates at a coordinate"""
+    def get_candidates(self, coord: int) -> int:
+        """Generates the bitmask of candidates at a coordinate"""
         digit = self.values[coord]
         if digit != 0:
-            return {digit}
-        values_of_peers = {self.values[peer] for peer in peers[coord]}
-        return set(range(1, 10)) - values_of_peers
-
-    def get_candidate_dict(self) -> dict[str, set[int]]:
-        """Returns the dictionary of candidates for all coordinates"""
-        return {coord: self.get_candidates(coord) for coord in coords}
-
-    def get_next_coord(self) -> str | None:
-        """Returns the free coordinate with the least number of candidates"""
-        try:
-            return min(
-                (coord for coord in coords if self.values[coord] == 0),
-                key=lambda coord: len(self.candidates[coord]),
-            )
-        except ValueError:
-            return None
-
-    def remove_candidate(self, coord: str, digit: int) -> None:
+            return BIT[digit]
+        mask = ALL_DIGITS
+        for peer in peers[coord]:
+            mask &= NBIT[self.values[peer]]
+        return mask
+
+    def get_candidate_list(self) -> list[int]:
+        """Returns the list of candidate bitmasks for all coordinates,
+        derived from masks of the digits already used in each row,
+        column and box (four bit operations per square instead of a
+        loop over all 20 peers)"""
+        row_used = [0] * 9
+        col_used = [0] * 9
+        box_used = [0] * 9
+        for coord, digit in enumerate(self.values):
+            if digit:
+                bit = BIT[digit]
+                row_used[coord // 9] |= bit
+                col_used[coord % 9] |= bit
+                box_used[BOX_OF[coord]] |= bit
+        return [
+            BIT[digit]
+            if digit
+            else ALL_DIGITS
+            & ~(row_used[coord // 9] | col_used[coord % 9] | box_used[BOX_OF[coord]])
+            for coord, digit in enumerate(self.values)
+        ]
+
+    def get_next_coord(self) -> int | None:
+        """Returns the free coordinate with the least number of candidates,
+        or None if all squares are filled. After propagation no free square
+        has fewer than two candidates, so the scan stops at the first
+        square with exactly two."""
+        best = -1
+        best_count = 10
+        for coord in coords:
+            if self.values[coord] == 0:
+                count = POPCOUNT[self.candidates[coord]]
+                if count < best_count:
+                    if count <= 2:
+                        return coord
+                    best_count = count
+                    best = coord
+        return None if best < 0 else best
+
+    def remove_candidate(self, coord: int, digit: int, trail: Trail) -> None:
         """Removes a candidate from a coordinate (in case it's there),
         detects if a contradiction arises, and if a single candidate
         is left this cabdidate is set as a value."""
-        if digit not in self.candidates[coord]:
+        mask = self.candidates[coord]
+        if not mask & BIT[digit]:
             return
-        self.candidates[coord].remove(digit)
-        if not self.candidates[coord]:
+        trail.append((coord, self.values[coord], mask))
+        mask &= NBIT[digit]
+        self.candidates[coord] = mask
+        self.dirty_units.update(unit_indices_of[coord])
+        if not mask:
             self.has_contradiction = True
-        elif len(self.candidates[coord]) == 1:
-            candidate = list(self.candidates[coord])[0]
-            self.set_digit(coord, candidate)
+        elif not mask & (mask - 1):
+            self.set_digit(coord, mask.bit_length(), trail)
 
-    def set_digit(self, coord: str, digit: int) -> None:
+    def set_digit(self, coord: int, digit: int, trail: Trail) -> None:
         """Sets a digit at a given coordinate and removes that digit
-        from the candidates of the coordinate's peers"""
-        self.values[coord] = digit
-        self.candidates[coord] = {digit}
-        for peer in peers[coord]:
-            self.remove_candidate(peer, digit)
-            if self.has_contradiction:
-                break
+        from the candidates of the coordinate's peers. Naked singles
+        uncovered along the way are collected on a worklist and assigned
+        in the same loop, so the cascade needs no recursion."""
+        queue = [(coord, digit)]
+        while queue:
+            coord, digit = queue.pop()
+            bit = BIT[digit]
+            mask = self.candidates[coord]
+            if not mask & bit:
+                self.has_contradiction = True
+                return
+            if self.values[coord] == digit:
+                continue
+            trail.append((coord, self.values[coord], mask))
+            self.values[coord] = digit
+            self.candidates[coord] = bit
+            self.dirty_units.update(unit_indices_of[coord])
+            for peer in peers[coord]:
+                peer_mask = self.candidates[peer]
+                if peer_mask & bit:
+                    trail.append((peer, self.values[peer], peer_mask))
+                    peer_mask ^= bit
+                    self.candidates[peer] = peer_mask
+                    self.dirty_units.update(unit_indices_of[peer])
+                    if not peer_mask:
+                        self.has_contradiction = True
+                        return
+                    if not peer_mask & (peer_mask - 1):
+                        queue.append((peer, peer_mask.bit_length()))
+
+    def undo(self, trail: Trail, mark: int = 0) -> None:
+        """Rewinds the trail down to the given mark, restoring the values
+        and candidates that were recorded before each mutation"""
+        while len(trail) > mark:
+            coord, value, mask = trail.pop()
+            self.values[coord] = value
+            self.candidates[coord] = mask
+            self.dirty_units.update(unit_indices_of[coord])
+        self.has_contradiction = False
 
-    def get_hidden_single(self) -> None | tuple[int, str]:
+    def get_hidden_single(self) -> None | tuple[int, int]:
         """Returns a hidden single in a unit if present: a row, column or box
-        where some digit has only one possible coordinate left"""
-        for digit in range(1, 10):
-            for unit in all_units:
-                possible_coords = [
-                    coord
-                    for coord in unit
-                    if self.values[coord] == 0 and digit in self.candidates[coord]
-                ]
-                if len(possible_coords) == 1:
-                    return digit, possible_coords[0]
+        where some digit has only one possible coordinate left. Only units
+        whose candidates changed since the last scan are examined."""
+        while self.dirty_units:
+            unit = all_units[self.dirty_units.pop()]
+            once = 0  # digits seen in at least one free square
+            more = 0  # digits seen in at least two free squares
+            for coord in unit:
+                if self.values[coord] == 0:
+                    mask = self.candidates[coord]
+                    more |= once & mask
+                    once |= mask
+            singles = once & ~more
+            if singles:
+                bit = singles & -singles
+                for coord in unit:
+                    if self.values[coord] == 0 and self.candidates[coord] & bit:
+                        return bit.bit_length(), coord
         return None
 
+    def remove_naked_pairs(self, trail: Trail) -> bool:
+        """Searches all units for a naked pair: two free squares sharing the
+        same two candidates. These two digits can be removed from all other
+        squares of the unit. Returns whether any candidate was removed."""
+        changed = False
+        for unit in all_units:
+            pairs = [
+                (coord, self.candidates[coord])
+                for coord in unit
+                if self.values[coord] == 0 and POPCOUNT[self.candidates[coord]] == 2
+            ]
+            for index, (coord, mask) in enumerate(pairs):
+                for other, other_mask in pairs[index + 1 :]:
+                    if mask != other_mask:
+                        continue
+                    for target in unit:
+                        if target == coord or target == other:
+                            continue
+                        if self.values[target]:
+                            continue
+                        for digit in iter_digits(mask & self.candidates[target]):
+                            changed = True
+                            self.remove_candidate(target, digit, trail)
+                            if self.has_contradiction:
+                                return changed
+        return changed
+
+    def remove_locked_candidates(self, trail: Trail) -> bool:
+        """Searches all boxes for locked candidates: a digit whose possible
+        squares within a box all lie in the same row (or column). Such a
+        digit must go into the box on that line, so it can be removed from
+        the rest of the line. Also applies the converse (claiming): a digit
+        whose possible squares within a line all lie in the same box can be
+        removed from the rest of the box. Returns whether any candidate was
+        removed."""
+        changed = False
+        for box_index, box in enumerate(box_units):
+            row_masks = [0, 0, 0]  # digits open in each row of the box
+            col_masks = [0, 0, 0]  # digits open in each column of the box
+            for position, coord in enumerate(box):
+                if self.values[coord] == 0:
+                    mask = self.candidates[coord]
+                    row_masks[position // 3] |= mask
+                    col_masks[position % 3] |= mask
+            for line_index in range(3):
+                locked_row = (
+                    row_masks[line_index]
+                    & ~row_masks[(line_index + 1) % 3]
+                    & ~row_masks[(line_index + 2) % 3]
+                )
+                locked_col = (
+                    col_masks[line_index]
+                    & ~col_masks[(line_index + 1) % 3]
+                    & ~col_masks[(line_index + 2) % 3]
+                )
+                for locked, unit in (
+                    (locked_row, row_units[3 * (box_index // 3) + line_index]),
+                    (locked_col, col_units[3 * (box_index % 3) + line_index]),
+                ):
+                    if not locked:
+                        continue
+                    for coord in unit:
+                        if BOX_OF[coord] == box_index or self.values[coord]:
+                            continue
+                        for digit in iter_digits(locked & self.candidates[coord]):
+                            changed = True
+                            self.remove_candidate(coord, digit, trail)
+                            if self.has_contradiction:
+                                return changed
+        for line in all_units[:18]:  # the rows and columns
+            segment_masks = [0, 0, 0]  # digits open in each box segment
+            for position, coord in enumerate(line):
+                if self.values[coord] == 0:
+                    segment_masks[position // 3] |= self.candidates[coord]
+            for segment in range(3):
+                claimed = (
+                    segment_masks[segment]
+                    & ~segment_masks[(segment + 1) % 3]
+                    & ~segment_masks[(segment + 2) % 3]
+                )
+                if not claimed:
+                    continue
+                for coord in box_units[BOX_OF[line[3 * segment]]]:
+                    if coord in line or self.values[coord]:
+                        continue
+                    for digit in iter_digits(claimed & self.candidates[coord]):
+                        changed = True
+                        self.remove_candidate(coord, digit, trail)
+                        if self.has_contradiction:
+                            return changed
+        return changed
+
+    def propagate(self, trail: Trail) -> None:
+        """Applies the solving strategies (hidden singles, naked pairs and
+        locked candidates) repeatedly until no more progress is made or a
+        contradiction arises"""
+        while not self.has_contradiction:
+            single = self.get_hidden_single()
+            if single:
+                digit, coord = single
+                self.set_digit(coord, digit, trail)
+                continue
+            if self.remove_naked_pairs(trail):
+                continue
+            if not self.remove_locked_candidates(trail):
+                break
+
     def solutions(self) -> Iterator[Sudoku]:
-        """Generates solutions of the given Sudoku"""
-
-        # get and set hidden single
-        single = self.get_hidden_single()
-        if single:
-            digit, coord = single
-            self.set_digit(coord, digit)
-            if not self.has_contradiction:
-                yield from self.solutions()
-            return
+        """Generates solutions of the given Sudoku with an iterative
+        depth-first search. Each stack frame holds a branching coordinate,
+        the bitmask of its untried candidates and the trail mark to rewind
+        to before the next trial, so no recursion or per-branch copy of the
+        board is needed."""
+        trail: Trail = []
+        stack: list[list[int]] = []  # [coord, candidate mask, trail mark]
+        exploring = True
+
+        while True:
+            if exploring:
+                self.propagate(trail)
+                if not self.has_contradiction:
+                    # take coordinate with least number of candidates left
+                    next_coord = self.get_next_coord()
+                    if next_coord is None:
+                        yield self.copy()
+                    else:
+                        stack.append([next_coord, self.candidates[next_coord], len(trail)])
+
+            # backtrack to the next untried candidate
+            exploring = False
+            while stack:
+                frame = stack[-1]
+                coord, mask, mark = frame
+                if not mask:
+                    stack.pop()
+                    continue
+                bit = mask & -mask
+                frame[1] = mask ^ bit
+                self.undo(trail, mark)
+                self.set_digit(coord, bit.bit_length(), trail)
+                if self.has_contradiction:
+                    continue
+                exploring = True
+                break
 
-        # take coordinate with least number of candidates left
-        next_coord = self.get_next_coord()
-        if not next_coord:
-            yield self
-            return
+            if not exploring:
+                self.undo(trail)
+                return
+
+
+def _solve_branch(values: list[int]) -> list[list[int]]:
+    """Solves one branch board and returns the values of all its solutions
+    (top-level, so it can be pickled for the process pool)"""
+    return [solution.values for solution in Sudoku(values).solutions()]
+
+
+def parallel_solutions(sudoku: Sudoku) -> list[Sudoku]:
+    """Computes all solutions of the Sudoku by splitting on the candidates
+    of the first branching coordinate and searching the resulting boards
+    on a process pool. Each branch is an independent subproblem, so this
+    scales with the number of cores; for a typical single-solution puzzle
+    the pool startup outweighs the search, but boards with large solution
+    sets profit."""
+    trail: Trail = []
+    work = sudoku.copy()
+    work.propagate(trail)
+    if work.has_contradiction:
+        return []
+    coord = work.get_next_coord()
+    if coord is None:
+        return [work]
+    branches = []
+    mark = len(trail)
+    for digit in iter_digits(work.candidates[coord]):
+        work.set_digit(coord, digit, trail)
+        if not work.has_contradiction:
+            branches.append(work.values.copy())
+        work.undo(trail, mark)
+    with Pool() as pool:
+        results = pool.map(_solve_branch, branches)
+    return [Sudoku(values) for result in results for values in result]
+
+
+def solve_line(line: str) -> tuple[str, float]:
+    """Solves a single puzzle line and returns its unique solution as a
+    one-line string together with the elapsed time"""
+    sudoku = Sudoku.generate_from_string(line)
+    start = perf_counter()
+    sols = list(sudoku.solutions())
+    end = perf_counter()
+    assert len(sols) == 1
+    return sols[0].to_line(), end - start
 
-        # test all candidates
-        for candidate in self.candidates[next_coord]:
-            copy = self.copy() if len(self.candidates[next_coord]) > 1 else self
-            copy.set_digit(next_coord, candidate)
-            if not copy.has_contradiction:
-                yield from copy.solutions()
+
+def solve_many(lines: Iterable[str]) -> Iterator[str]:
+    """Solves a batch of puzzles given as one-line strings and yields
+    the first solution of each as a one-line string. The precomputed
+    tables (units, peers, digit masks) live at module level, so their
+    setup cost is paid once for the whole batch."""
+    for line in lines:
+        sudoku = Sudoku.generate_from_string(line)
+        solution = next(sudoku.solutions(), None)
+        assert solution is not None, "puzzle has no solution"
+        yield solution.to_line()
 
 
 def measure_time() -> None:
-    """Solves all sudoku samples and measures the time"""
-    sudoku_counter: int = 0
-    total: float = 0
+    """Solves all sudoku samples in parallel and measures the time.
+    The puzzles are independent, so they are distributed over all
+    cores with a multiprocessing pool; the results are written in the
+    original order once all puzzles are solved."""
+    with open("data/samples.txt", "r", encoding="utf8") as sample_file:
+        lines = [line for line in sample_file if not line.startswith("#")]
+    print("solving", len(lines), "sudokus")
+    with Pool() as pool:
+        results = list(pool.imap(solve_line, lines, chunksize=8))
+    total = sum(duration for _, duration in results)
     with open("data/solutions.txt", "w", encoding="utf8") as sol_file:
-        with open("data/performance.txt", "w", encoding="utf8") as perf_file:
-            with open("data/samples.txt", "r", encoding="utf8") as sample_file:
-                for line in sample_file:
-                    if line.startswith("#"):
-                        continue
-                    sudoku_counter += 1
-                    sudoku = Sudoku.generate_from_string(line)
-                    print("solving sudoku", sudoku_counter)
-                    start = perf_counter()
-                    sols = list(sudoku.solutions())
-                    end = perf_counter()
-                    perf_file.write(str(end - start) + "\n")
-                    total += end - start
-                    assert len(sols) == 1
-                    sol_file.write(sols[0].to_line() + "\n")
-            perf_file.write("total: " + str(total) + "\n")
-            average = total / sudoku_counter
-            perf_file.write("average: " + str(average) + "\n")
+        sol_file.writelines(solution + "\n" for solution, _ in results)
+    with open("data/performance.txt", "w", encoding="utf8") as perf_file:
+        perf_file.writelines(str(duration) + "\n" for _, duration in results)
+        perf_file.write("total: " + str(total) + "\n")
+        perf_file.write("average: " + str(total / len(results)) + "\n")
     print("results written to data/performance.txt and data/solutions.txt")
 
 
@@ -246,5 +531,11 @@ def solve_sample() -> None:
 
 
 if __name__ == "__main__":
-    # solve_sample()
-    measure_time()
+    if len(argv) > 1:
+        with open(argv[1], "r", encoding="utf8") as puzzle_file:
+            puzzles = [line for line in puzzle_file if not line.startswith("#")]
+        for line_solution in solve_many(puzzles):
+            print(line_solution)
+    else:
+        # solve_sample()
+        measure_time()
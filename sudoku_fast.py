@@ -0,0 +1,192 @@
+"""Numba-accelerated Sudoku solver
+
+This module mirrors the algorithm of `sudoku.py` (constraint propagation
+with naked and hidden singles plus backtracking search over the square
+with the least number of candidates), but implements it as free functions
+over fixed-size NumPy arrays so that Numba compiles the hot loops to
+native code. The recursion is replaced by an explicit stack, since Numba
+does not support generators. Importing this module requires `numpy` and
+`numba`; the pure Python solver in `sudoku.py` works without them.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from numba import njit
+
+from sudoku import ALL_DIGITS, all_units, peers
+
+UNITS = np.array([list(unit) for unit in all_units], dtype=np.int8)
+"""All 27 units (rows, columns, boxes) as a 27 x 9 array of coordinates,
+taken from sudoku.py so both solvers share one source of truth"""
+
+PEERS = np.array([list(peer_row) for peer_row in peers], dtype=np.int8)
+"""All peers of a coordinate as a 81 x 20 array of coordinates"""
+
+
+@njit(cache=True)
+def _bit_length(mask: int) -> int:
+    """Computes the position of the highest set bit of a mask"""
+    length = 0
+    while mask:
+        length += 1
+        mask >>= 1
+    return length
+
+
+@njit(cache=True)
+def _assign(values, cand, coord, digit, peers) -> bool:
+    """Assigns a digit to a coordinate and propagates all resulting naked
+    singles with a worklist. Returns False if a contradiction arises."""
+    queue = np.empty((81, 2), dtype=np.int64)
+    queue[0, 0] = coord
+    queue[0, 1] = digit
+    size = 1
+    head = 0
+    while head < size:
+        c = queue[head, 0]
+        d = queue[head, 1]
+        head += 1
+        bit = 1 << (d - 1)
+        if cand[c] & bit == 0:
+            return False
+        if values[c] == d:
+            continue
+        values[c] = d
+        cand[c] = bit
+        for k in range(20):
+            p = peers[c, k]
+            if cand[p] & bit:
+                mask = cand[p] ^ bit
+                cand[p] = mask
+                if mask == 0:
+                    return False
+                if values[p] == 0 and mask & (mask - 1) == 0:
+                    queue[size, 0] = p
+                    queue[size, 1] = _bit_length(mask)
+                    size += 1
+    return True
+
+
+@njit(cache=True)
+def _find_hidden_single(values, cand, units) -> tuple[int, int]:
+    """Finds a hidden single in a unit, returned as a (coordinate, digit)
+    pair, or (-1, 0) if there is none."""
+    for u in range(27):
+        once = 0
+        more = 0
+        for k in range(9):
+            c = units[u, k]
+            if values[c] == 0:
+                mask = cand[c]
+                more |= once & mask
+                once |= mask
+        singles = once & ~more
+        if singles:
+            bit = singles & -singles
+            for k in range(9):
+                c = units[u, k]
+                if values[c] == 0 and cand[c] & bit:
+                    return c, _bit_length(bit)
+    return -1, 0
+
+
+@njit(cache=True)
+def _next_coord(values, cand) -> int:
+    """Returns the free coordinate with the least number of candidates,
+    or -1 if all squares are filled"""
+    best = -1
+    best_count = 10
+    for c in range(81):
+        if values[c] == 0:
+            mask = cand[c]
+            count = 0
+            while mask:
+                count += mask & 1
+                mask >>= 1
+            if count < best_count:
+                best_count = count
+                best = c
+                if count <= 2:
+                    break
+    return best
+
+
+@njit(cache=True)
+def _search(values, cand, peers, units, solutions, max_solutions) -> int:
+    """Iterative depth-first search. Fills the given solutions array and
+    returns the number of solutions found (at most max_solutions)."""
+    count = 0
+    depth = 0
+    stack_values = np.empty((81, 81), dtype=np.int8)
+    stack_cand = np.empty((81, 81), dtype=np.uint16)
+    stack_coord = np.empty(81, dtype=np.int64)
+    stack_mask = np.empty(81, dtype=np.int64)
+    ok = True
+    while True:
+        if ok:
+            # set hidden singles until there are none left
+            while True:
+                coord, digit = _find_hidden_single(values, cand, units)
+                if coord < 0:
+                    break
+                ok = _assign(values, cand, coord, digit, peers)
+                if not ok:
+                    break
+        if ok:
+            coord = _next_coord(values, cand)
+            if coord < 0:
+                solutions[count] = values
+                count += 1
+                if count == max_solutions:
+                    return count
+            else:
+                stack_values[depth] = values
+                stack_cand[depth] = cand
+                stack_coord[depth] = coord
+                stack_mask[depth] = cand[coord]
+                depth += 1
+        # backtrack to the next untried candidate
+        ok = False
+        while depth > 0:
+            mask = stack_mask[depth - 1]
+            if mask == 0:
+                depth -= 1
+                continue
+            bit = mask & -mask
+            stack_mask[depth - 1] = mask ^ bit
+            values[:] = stack_values[depth - 1]
+            cand[:] = stack_cand[depth - 1]
+            ok = _assign(values, cand, stack_coord[depth - 1], _bit_length(bit), peers)
+            if ok:
+                break
+        if not ok and depth == 0:
+            return count
+
+
+def solve(values: list[int], max_solutions: int = 1) -> list[list[int]]:
+    """Solves a Sudoku given as a flat list of 81 digits (0 for a free
+    square) and returns up to max_solutions solutions as such lists"""
+    board = np.asarray(values, dtype=np.int8)
+    # compute all 81 initial candidate masks in one vectorized pass:
+    # the candidates of a free square are the complement of the ORed
+    # digit bits placed at its 20 peers
+    shifts = (np.maximum(board, 1) - 1).astype(np.int32)
+    placed = np.where(board > 0, np.left_shift(np.int32(1), shifts), 0)
+    peer_mask = np.bitwise_or.reduce(placed[PEERS], axis=1)
+    if np.any(placed & peer_mask):
+        return []  # two peers carry the same given digit
+    cand = np.where(board > 0, placed, ALL_DIGITS & ~peer_mask).astype(np.uint16)
+    solutions = np.empty((max_solutions, 81), dtype=np.int8)
+    count = _search(board.copy(), cand, PEERS, UNITS, solutions, max_solutions)
+    return [list(map(int, solutions[i])) for i in range(count)]
+
+
+def solve_string(string: str, max_solutions: int = 1) -> list[str]:
+    """Solves a Sudoku given as a one-line string as in the samples file
+    and returns up to max_solutions solutions as such strings"""
+    string = string.replace("\n", "")
+    assert len(string) == 81
+    values = [int(c) if c.isnumeric() else 0 for c in string]
+    solutions = solve(values, max_solutions)
+    return ["".join(map(str, solution)) for solution in solutions]
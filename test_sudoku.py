@@ -1,86 +1,65 @@
 """Tests for Sudoku class"""
 from sudoku import (
     Sudoku,
-    key,
     coords,
     peers,
     all_units,
     row_units,
     col_units,
     box_units,
+    units_of,
+    iter_digits,
+    parallel_solutions,
+    solve_many,
 )
 
 # pylint: disable=line-too-long, missing-function-docstring
 
 
-def test_key():
-    assert key(2, 3) == "23"
-    assert key(0, 8) == "08"
-
-
 def test_coords():
-    assert isinstance(coords, set)
     assert len(coords) == 81
-    assert "25" in coords
-    assert "89" not in coords
-    for coord in coords:
-        assert isinstance(coord, str)
-        assert len(coord) == 2
+    assert list(coords) == list(range(81))
 
 
 def test_units():
     assert isinstance(all_units, list)
     assert len(all_units) == 9 + 9 + 9  # 9 rows, 9 columns, 9 boxes
-    row_unit = {"00", "01", "02", "03", "04", "05", "06", "07", "08"}
-    assert row_unit in row_units
-    col_unit = {"01", "11", "21", "31", "41", "51", "61", "71", "81"}
-    assert col_unit in col_units
-    box_unit = {"00", "01", "02", "10", "11", "12", "20", "21", "22"}
-    assert box_unit in box_units
+    row_unit = [0, 1, 2, 3, 4, 5, 6, 7, 8]
+    assert row_unit in [list(unit) for unit in row_units]
+    col_unit = [1, 10, 19, 28, 37, 46, 55, 64, 73]
+    assert col_unit in [list(unit) for unit in col_units]
+    box_unit = [0, 1, 2, 9, 10, 11, 18, 19, 20]
+    assert box_unit in [list(unit) for unit in box_units]
     for unit in all_units:
-        assert isinstance(unit, set)
         assert len(unit) == 9
 
 
+def test_units_of():
+    assert len(units_of) == 81
+    for coord in coords:
+        assert len(units_of[coord]) == 3
+        for unit in units_of[coord]:
+            assert unit in all_units
+            assert coord in unit
+
+
 def test_peers():
-    assert isinstance(peers, dict)
-    for coord, peers_of_coord in peers.items():
-        assert isinstance(peers_of_coord, set)
+    assert len(peers) == 81
+    for coord in coords:
+        peers_of_coord = list(peers[coord])
         assert len(peers_of_coord) == 20
         assert coord not in peers_of_coord
         for peer in peers_of_coord:
-            assert isinstance(peer, str)
-            assert len(peer) == 2
-    assert peers["00"] == {
-        "22",
-        "06",
-        "30",
-        "40",
-        "60",
-        "01",
-        "12",
-        "10",
-        "50",
-        "02",
-        "20",
-        "04",
-        "08",
-        "07",
-        "80",
-        "70",
-        "05",
-        "21",
-        "03",
-        "11",
-    }
+            assert peer in coords
+    assert sorted(peers[0]) == [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 18, 19, 20, 27, 36, 45, 54, 63, 72]
 
 
 def test_string_generation():
     string = "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5...."
     sudoku = Sudoku.generate_from_string(string)
-    assert sudoku.values["00"] == 4
-    assert sudoku.values["01"] == 8
-    assert sudoku.values["88"] == 0
+    assert sudoku.values[0] == 4
+    assert sudoku.values[1] == 8
+    assert sudoku.values[80] == 0
 
 
 def test_board_generation():
@@ -96,18 +75,24 @@ def test_board_generation():
         [0, 0, 0, 0, 8, 0, 0, 7, 9],
     ]
     sudoku = Sudoku.generate_from_board(board)
-    assert sudoku.values["00"] == 5
-    assert sudoku.values["88"] == 9
+    assert sudoku.values[0] == 5
+    assert sudoku.values[80] == 9
+
+
+def test_iter_digits():
+    assert list(iter_digits(0)) == []
+    assert list(iter_digits(0b000001000)) == [4]
+    assert list(iter_digits(0b101100000)) == [6, 7, 9]
 
 
 def test_candidates():
     sample = "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5...."
     sudoku = Sudoku.generate_from_string(sample)
     candidates = sudoku.candidates
-    assert isinstance(candidates, dict)
-    assert candidates["00"] == {4}
-    assert candidates["02"] == {6, 7, 9}
-    assert candidates["34"] == {1, 3, 4, 8, 9}
+    assert isinstance(candidates, list)
+    assert set(iter_digits(candidates[0])) == {4}
+    assert set(iter_digits(candidates[2])) == {6, 7, 9}
+    assert set(iter_digits(candidates[31])) == {1, 3, 4, 8, 9}
 
 
 def test_printing():
@@ -131,6 +116,39 @@ def test_printing():
     )
 
 
+def test_naked_pairs():
+    sudoku = Sudoku.generate_from_board([[0] * 9 for _ in range(9)])
+    pair = 0b000000011  # digits 1 and 2
+    sudoku.candidates[0] = pair
+    sudoku.candidates[1] = pair
+    changed = sudoku.remove_naked_pairs([])
+    assert changed
+    for coord in [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 18, 19, 20]:
+        assert set(iter_digits(sudoku.candidates[coord])) == {3, 4, 5, 6, 7, 8, 9}
+
+
+def test_locked_candidates():
+    sudoku = Sudoku.generate_from_board([[0] * 9 for _ in range(9)])
+    # confine digit 1 to the first row of the first box
+    for coord in [9, 10, 11, 18, 19, 20]:
+        sudoku.candidates[coord] &= ~0b000000001
+    changed = sudoku.remove_locked_candidates([])
+    assert changed
+    for coord in [3, 4, 5, 6, 7, 8]:
+        assert set(iter_digits(sudoku.candidates[coord])) == {2, 3, 4, 5, 6, 7, 8, 9}
+
+
+def test_claimed_candidates():
+    sudoku = Sudoku.generate_from_board([[0] * 9 for _ in range(9)])
+    # confine digit 1 in the first row to the first box
+    for coord in [3, 4, 5, 6, 7, 8]:
+        sudoku.candidates[coord] &= ~0b000000001
+    changed = sudoku.remove_locked_candidates([])
+    assert changed
+    for coord in [9, 10, 11, 18, 19, 20]:
+        assert set(iter_digits(sudoku.candidates[coord])) == {2, 3, 4, 5, 6, 7, 8, 9}
+
+
 def test_solving_algorithm():
     sample = "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5...."
     soluti = "487312695593684271126597384735849162914265837268731549851476923379128456642953718"
@@ -148,3 +166,23 @@ def test_several_solutions():
     sols = list(sudoku.solutions())
     assert len(sols) == 6
     assert any(sol.to_line() == soluti for sol in sols)
+
+
+def test_solve_many():
+    samples = [
+        "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5....",
+        "....5.2......479..1.5.6.8..246......3.7...4.6......753..9.8.5....821......4.7....",
+    ]
+    solutions = list(solve_many(samples))
+    assert len(solutions) == 2
+    assert solutions[0] == "487312695593684271126597384735849162914265837268731549851476923379128456642953718"
+    assert all(len(solution) == 81 for solution in solutions)
+
+
+def test_parallel_solutions():
+    sample = "....5.2......479..1.5.6.8..246......3.7...4.6......753..9.8.5....821......4.7...."
+    soluti = "493158267862347915175962834246735198357891426981426753719683542538214679624579381"
+    sudoku = Sudoku.generate_from_string(sample)
+    sols = parallel_solutions(sudoku)
+    assert len(sols) == 6
+    assert any(sol.to_line() == soluti for sol in sols)
@@ -0,0 +1,37 @@
+"""Tests for the Numba-accelerated solver"""
+import pytest
+
+pytest.importorskip("numba")
+
+from sudoku_fast import solve, solve_string
+
+# pylint: disable=line-too-long, missing-function-docstring, wrong-import-position
+
+
+def test_solve():
+    sample = "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5...."
+    values = [int(c) if c.isnumeric() else 0 for c in sample]
+    solutions = solve(values, max_solutions=2)
+    assert len(solutions) == 1
+    assert solutions[0][0] == 4
+    assert all(digit in range(1, 10) for digit in solutions[0])
+
+
+def test_solve_string():
+    sample = "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5...."
+    soluti = "487312695593684271126597384735849162914265837268731549851476923379128456642953718"
+    solutions = solve_string(sample, max_solutions=2)
+    assert solutions == [soluti]
+
+
+def test_solve_string_several_solutions():
+    sample = "....5.2......479..1.5.6.8..246......3.7...4.6......753..9.8.5....821......4.7...."
+    soluti = "493158267862347915175962834246735198357891426981426753719683542538214679624579381"
+    solutions = solve_string(sample, max_solutions=10)
+    assert len(solutions) == 6
+    assert soluti in solutions
+
+
+def test_solve_string_unsolvable():
+    sample = "55.3............71.2.......7.5....6....2..8.............1.76...3.....4......5...."
+    assert solve_string(sample) == []